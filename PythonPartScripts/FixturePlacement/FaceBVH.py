@@ -0,0 +1,233 @@
+"""Module containing implementation of a bounding volume hierarchy over polyhedron faces"""
+import heapq
+
+import numpy as np
+
+
+class FaceBVH():
+    """Bounding volume hierarchy (BVH) of axis aligned bounding boxes (AABB) over polyhedron faces.
+
+    The hierarchy is built once per polyhedron and answers the query for the face nearest to
+    a point by a best-first descent, in which the subtrees whose bounding box is further away
+    than the best face found so far are skipped.
+
+    The distance between a point and a face is measured as the larger of:
+
+    -   the distance between the point and the face's plane
+    -   the distance between the point and the face's bounding box
+
+    Both are lower bounds of the exact distance between the point and the face polygon.
+    Taking the bounding box into account prevents snapping to faces, whose plane passes close
+    to the point, but which themselves are far away from it.
+
+    The nodes are stored as flat NumPy arrays. The faces are reordered, so that the faces
+    of each leaf occupy a contiguous range.
+
+    Attributes:
+        _face_nv:       normal vectors of the faces as (F,3) array, in the order of the leaves
+        _face_vtx:      one vertex of each face as (F,3) array, in the order of the leaves
+        _face_min:      minimum corners of the faces' bounding boxes as (F,3) array
+        _face_max:      maximum corners of the faces' bounding boxes as (F,3) array
+        _face_index:    original index of each face as (F,) array
+        _node_min:      minimum corners of the nodes' bounding boxes as (N,3) array
+        _node_max:      maximum corners of the nodes' bounding boxes as (N,3) array
+        _node_left:     index of the left child node as (N,) array, -1 for leaves
+        _node_right:    index of the right child node as (N,) array, -1 for leaves
+        _node_start:    index of the first face of a leaf as (N,) array
+        _node_count:    number of faces in a leaf as (N,) array, 0 for inner nodes
+    """
+
+    LEAF_SIZE = 4
+    """Maximum number of faces in a leaf node"""
+
+    def __init__(self,
+                 face_nv : np.ndarray,
+                 face_vtx: np.ndarray,
+                 face_min: np.ndarray,
+                 face_max: np.ndarray):
+        """Build the hierarchy
+
+        The faces are split recursively at the median of their bounding box centers
+        along the longest axis of the node's bounding box.
+
+        Args:
+            face_nv:    normal vectors of the faces as (F,3) array
+            face_vtx:   one vertex of each face as (F,3) array
+            face_min:   minimum corners of the faces' bounding boxes as (F,3) array
+            face_max:   maximum corners of the faces' bounding boxes as (F,3) array
+
+        Raises:
+            ValueError: when there are no faces
+        """
+        if not (faces_count := len(face_nv)):
+            raise ValueError("Cannot build a hierarchy without faces")
+
+        centers    = (face_min + face_max) * 0.5
+        face_index = np.arange(faces_count)
+
+        node_min  : list[np.ndarray] = []
+        node_max  : list[np.ndarray] = []
+        node_left : list[int]        = []
+        node_right: list[int]        = []
+        node_start: list[int]        = []
+        node_count: list[int]        = []
+
+        # each stack item is (node index, first face, last face + 1)
+        stack = [(self._append_node(node_min, node_max, node_left, node_right, node_start, node_count), 0, faces_count)]
+
+        while stack:
+            node, start, end = stack.pop()
+            node_faces       = face_index[start:end]
+            node_min[node]   = face_min[node_faces].min(axis=0)
+            node_max[node]   = face_max[node_faces].max(axis=0)
+
+            if end - start <= self.LEAF_SIZE:
+                node_start[node] = start
+                node_count[node] = end - start
+                continue
+
+            # split at the median along the longest axis
+            axis  = int((node_max[node] - node_min[node]).argmax())
+            mid   = (end - start) // 2
+            order = np.argpartition(centers[node_faces, axis], mid)
+
+            face_index[start:end] = node_faces[order]
+
+            left  = self._append_node(node_min, node_max, node_left, node_right, node_start, node_count)
+            right = self._append_node(node_min, node_max, node_left, node_right, node_start, node_count)
+
+            node_left[node]  = left
+            node_right[node] = right
+
+            stack.append((left, start, start + mid))
+            stack.append((right, start + mid, end))
+
+        self._face_nv    = np.ascontiguousarray(face_nv[face_index])
+        self._face_vtx   = np.ascontiguousarray(face_vtx[face_index])
+        self._face_min   = np.ascontiguousarray(face_min[face_index])
+        self._face_max   = np.ascontiguousarray(face_max[face_index])
+        self._face_index = face_index
+        self._node_min   = np.array(node_min)
+        self._node_max   = np.array(node_max)
+        self._node_left  = np.array(node_left)
+        self._node_right = np.array(node_right)
+        self._node_start = np.array(node_start)
+        self._node_count = np.array(node_count)
+
+    @staticmethod
+    def _append_node(node_min  : list[np.ndarray],
+                     node_max  : list[np.ndarray],
+                     node_left : list[int],
+                     node_right: list[int],
+                     node_start: list[int],
+                     node_count: list[int]) -> int:
+        """Append an empty leaf node to the node lists
+
+        Args:
+            node_min:   list with minimum corners of the nodes' bounding boxes
+            node_max:   list with maximum corners of the nodes' bounding boxes
+            node_left:  list with indices of the left child nodes
+            node_right: list with indices of the right child nodes
+            node_start: list with indices of the leaves' first faces
+            node_count: list with numbers of faces in the leaves
+
+        Returns:
+            index of the appended node
+        """
+        node_min.append(np.zeros(3))
+        node_max.append(np.zeros(3))
+        node_left.append(-1)
+        node_right.append(-1)
+        node_start.append(0)
+        node_count.append(0)
+
+        return len(node_left) - 1
+
+    @staticmethod
+    def _box_distance(point  : np.ndarray,
+                      box_min: np.ndarray,
+                      box_max: np.ndarray) -> np.ndarray:
+        """Calculate the distance between a point and axis aligned bounding boxes
+
+        Args:
+            point:      point as (3,) array
+            box_min:    minimum corners of the boxes as (...,3) array
+            box_max:    maximum corners of the boxes as (...,3) array
+
+        Returns:
+            distances, 0 for boxes containing the point
+        """
+        outside = np.maximum(np.maximum(box_min - point, point - box_max), 0.0)
+        return np.sqrt((outside * outside).sum(axis=-1))
+
+    def _nearest_face_in_leaf(self,
+                              point: np.ndarray,
+                              start: int,
+                              count: int) -> tuple[int, float]:
+        """Find the face nearest to the given point among the faces of a leaf
+
+        Args:
+            point:  point as (3,) array
+            start:  index of the leaf's first face
+            count:  number of faces in the leaf
+
+        Returns:
+            index of the nearest face in the reordered face arrays
+            distance between the point and this face
+        """
+        end = start + count
+
+        plane     = np.abs(np.einsum("ij,ij->i", self._face_nv[start:end], point - self._face_vtx[start:end]))
+        box       = self._box_distance(point, self._face_min[start:end], self._face_max[start:end])
+        distances = np.maximum(plane, box)
+        nearest   = int(distances.argmin())
+
+        return start + nearest, float(distances[nearest])
+
+    def nearest_face(self,
+                     point       : np.ndarray,
+                     max_distance: float = np.inf) -> tuple[int, float]:
+        """Find the face nearest to the given point
+
+        Only faces not further away than max_distance are considered, so that the subtrees
+        beyond it are skipped from the start.
+
+        Args:
+            point:          point as (3,) array
+            max_distance:   maximum distance between the point and the face
+
+        Returns:
+            index of the nearest face, as in the arrays passed to the constructor
+            distance between the point and this face
+
+            (-1, infinity), if there is no face within max_distance
+        """
+        best_index    = -1
+        best_distance = np.nextafter(max_distance, np.inf)
+
+        heap = [(float(self._box_distance(point, self._node_min[0], self._node_max[0])), 0)]
+
+        while heap:
+            lower_bound, node = heapq.heappop(heap)
+
+            if lower_bound >= best_distance:
+                break
+
+            if count := self._node_count[node]:
+                nearest, distance = self._nearest_face_in_leaf(point, self._node_start[node], count)
+
+                if distance < best_distance:
+                    best_distance = distance
+                    best_index    = int(self._face_index[nearest])
+                continue
+
+            for child in (self._node_left[node], self._node_right[node]):
+                child_distance = float(self._box_distance(point, self._node_min[child], self._node_max[child]))
+
+                if child_distance < best_distance:
+                    heapq.heappush(heap, (child_distance, int(child)))
+
+        if best_index < 0:
+            return -1, np.inf
+
+        return best_index, float(best_distance)
@@ -1,11 +1,78 @@
 """Module containing implementation of a snapping functionality """
+import functools
+import math
 import typing
 
+import numpy as np
+
 import NemAll_Python_BaseElements as AllplanBaseElements
 import NemAll_Python_Geometry as AllplanGeo
 import NemAll_Python_IFW_ElementAdapter as AllplanElementAdapter
 import NemAll_Python_IFW_Input as AllplanIFW
 
+from .FaceBVH import FaceBVH
+
+_DEFAULT_MSG_INFO = AllplanIFW.AddMsgInfo()
+"""Message info used, when the snapping is not triggered by a mouse message"""
+
+
+@functools.lru_cache(maxsize=32)
+def _rotation_matrix(nx: float, ny: float, nz: float, z_angle: float) -> np.ndarray:
+    """Calculate the rotation part of a placement matrix
+
+    See SnapToSolid._calc_placement_matrix for the meaning of the rotation. The result depends
+    only on the face normal vector and the angle, so it is cached: during mouse moves
+    over the same face only the translation changes.
+
+    Args:
+        nx:         X component of the normalized normal vector
+        ny:         Y component of the normalized normal vector
+        nz:         Z component of the normalized normal vector
+        z_angle:    additional rotation around local Z axis in radians
+
+    Returns:
+        rotation matrix as read-only (3,3) array
+    """
+    # steps 1 + 2: rotation around Z, skipping the alignment when the normal vector is vertical
+    angle = z_angle
+
+    if nx * nx + ny * ny >= 1e-22:
+        angle += math.atan2(ny, nx)
+
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+
+    # step 3: first two columns of the rotation aligning Z with -normal_vec
+    if 1.0 - nz < 1e-12:
+        # -normal_vec points in -Z: rotate by 180 degrees around X
+        ax, ay, az = 1.0, 0.0, 0.0
+        bx, by, bz = 0.0, -1.0, 0.0
+    else:
+        h          = 1.0 / (1.0 - nz)
+        ax, ay, az = -nz + h * ny * ny, -h * nx * ny,      nx
+        bx, by, bz = -h * nx * ny,      -nz + h * nx * nx, ny
+
+    rotation = np.empty((3, 3))
+    rotation[:, 0] = cos_a * ax + sin_a * bx, cos_a * ay + sin_a * by, cos_a * az + sin_a * bz
+    rotation[:, 1] = cos_a * bx - sin_a * ax, cos_a * by - sin_a * ay, cos_a * bz - sin_a * az
+    rotation[:, 2] = -nx, -ny, -nz
+    rotation.flags.writeable = False
+
+    return rotation
+
+
+def _polyhedron_filter(element: AllplanElementAdapter.BaseElementAdapter) -> bool:
+    """ Filter accepting only model elements with a polyhedron geometry
+
+    Args:
+        element: element to filter
+
+    Returns:
+        True, when element's geometry is a polyhedron
+    """
+    # cheap type check first, the geometry is fetched only if it passes
+    return element != AllplanElementAdapter.ClippingPathBody_TypeUUID and \
+        isinstance(element.GetModelGeometry(), AllplanGeo.Polyhedron3D)
+
 
 class SnapToSolid():
     """Implementation of snapping to a solid.
@@ -20,12 +87,23 @@ class SnapToSolid():
         Currently no support for BReps!
 
     Attributes:
-        _polyhedron:    reference polyhedron to snap to
-        _normal_vector: normal vector of the face, to which the snapping will be done
-        _coord_input:   object representing coordinate input in Allplan viewport
-        _filter:        filter to pick up objects valid for snapping
+        _polyhedron:     reference polyhedron to snap to
+        _reference_ele:  element, whose geometry is the reference polyhedron
+        _bvh:            hierarchy of the reference polyhedron's faces, None if not built
+        _last_key:       inputs of the last snap_by_point calculation, None if there is none
+        _last_matrix:    placement matrix resulting from the last snap_by_point calculation
+        _placement_buf:  scratch 4x4 array, into which the placement matrix is assembled
+        _normal_vector:  normal vector of the face, to which the snapping will be done
+        _coord_input:    object representing coordinate input in Allplan viewport
+        _doc:            document of the input view
+        _doc_id:         ID of the document of the input view
+        _highlighted:    whether an element was highlighted since the last cancellation
+        _filter:         filter to pick up objects valid for snapping
     """
 
+    MAX_FACES_COUNT = 2 ** 16
+    """Maximum number of faces of a polyhedron, that can be snapped to"""
+
     def __init__(self,
                  coord_input: AllplanIFW.CoordinateInput):
         """Default constructor
@@ -34,65 +112,114 @@ class SnapToSolid():
             coord_input:  object representing coordinate input in Allplan viewport
         """
         # set initial values of private properties
-        self._polyhedron  = AllplanGeo.Polyhedron3D()
-        self._coord_input = coord_input
-        self._normal_vec  = AllplanGeo.Vector3D(0, 0, 1)
+        self._polyhedron     = AllplanGeo.Polyhedron3D()
+        self._reference_ele  = AllplanElementAdapter.BaseElementAdapter()
+        self._bvh            : FaceBVH | None = None
+        self._coord_input    = coord_input
+        self._doc            = coord_input.GetInputViewDocument()
+        self._doc_id         = coord_input.GetInputViewDocumentID()
+        self._highlighted    = False
+        self._normal_vec     = AllplanGeo.Vector3D(0, 0, 1)
+        self._last_key       : tuple[float, ...] | None = None
+        self._last_matrix    = AllplanGeo.Matrix3D()
+        self._placement_buf  = np.identity(4)
 
         # set up a filter
-        class ElementFilter():
-            """ Implementation of a filter accepts only model elements with a polyhedron geometry"""
+        selection_query   = AllplanIFW.SelectionQuery([_polyhedron_filter])
+        self._filter = AllplanIFW.ElementSelectFilterSetting(filter            = selection_query,
+                                                             bSnoopAllElements = False)
 
-            def __call__(self, element: AllplanElementAdapter.BaseElementAdapter) -> bool:
-                """ Execute the filtering
+    def cancel_highlights(self):
+        """Cancel highlighting of all elements in the document of the input view
 
-                Args:
-                    element: element to filter
+        Nothing is done, if no element was highlighted since the last cancellation.
+        """
+        if self._highlighted:
+            AllplanIFW.HighlightService.CancelAllHighlightedElements(self._doc_id)
+            self._highlighted = False
 
-                Returns:
-                    True, when element's geometry is a polyhedron
-                """
+    def reset_reference(self):
+        """Forget the reference element and its face hierarchy
 
-                return all([isinstance(element.GetModelGeometry(), AllplanGeo.Polyhedron3D),
-                           element != AllplanElementAdapter.ClippingPathBody_TypeUUID])
+        Must be called, when the geometry of the reference element may have changed, e.g. after
+        it was modified, so that the next snap_by_point reads the geometry again.
+        """
+        self._reference_ele = AllplanElementAdapter.BaseElementAdapter()
+        self._polyhedron    = AllplanGeo.Polyhedron3D()
+        self._bvh           = None
+        self._last_key      = None
 
-        selection_query   = AllplanIFW.SelectionQuery([ElementFilter()])
-        self._filter = AllplanIFW.ElementSelectFilterSetting(filter            = selection_query,
-                                                             bSnoopAllElements = False)
+    def _rebuild_face_cache(self):
+        """Extract the face data of the reference polyhedron and build the face hierarchy
+
+        This is done once per new reference polyhedron, so that the snapping itself does not
+        need to query the polyhedron face by face. An empty reference polyhedron invalidates the cache.
+        The result of the last snap_by_point calculation is invalidated in any case.
+        """
+        self._last_key = None
+
+        if not (faces_count := self._polyhedron.GetFacesCount()):
+            self._bvh = None
+            return
+
+        face_nv  = np.empty((faces_count, 3), dtype=np.float64)
+        face_vtx = np.empty((faces_count, 3), dtype=np.float64)
+        face_min = np.empty((faces_count, 3), dtype=np.float64)
+        face_max = np.empty((faces_count, 3), dtype=np.float64)
+
+        # bind the polyhedron methods once, they are called for every face and edge
+        get_normal_vec    = self._polyhedron.GetNormalVectorOfFace
+        get_face          = self._polyhedron.GetFace
+        get_edge_vertices = self._polyhedron.GetEdgeVertices
 
-    def _find_nearest_face(self, polyhedron: AllplanGeo.Polyhedron3D, point: AllplanGeo.Point3D) -> tuple[int, float]:
-        """Finds the face of a given polyhedron, whose plane is closest to the given point
+        for face_index in range(faces_count):
+            _, normal_vec = get_normal_vec(face_index)
+            face          = get_face(face_index)
+            get_edge      = face.GetEdge
+            vertices      = []
+
+            for edge_index in range(face.GetEdgesCount()):
+                _, edge                     = get_edge(edge_index)
+                _, start_vertex, end_vertex = get_edge_vertices(edge)
+                vertices.append((start_vertex.X, start_vertex.Y, start_vertex.Z))
+                vertices.append((end_vertex.X, end_vertex.Y, end_vertex.Z))
+
+            face_vertices        = np.array(vertices)
+            face_nv[face_index]  = normal_vec.X, normal_vec.Y, normal_vec.Z
+            face_vtx[face_index] = face_vertices[0]
+            face_min[face_index] = face_vertices.min(axis=0)
+            face_max[face_index] = face_vertices.max(axis=0)
+
+        self._bvh = FaceBVH(face_nv, face_vtx, face_min, face_max)
+
+    def _find_nearest_face(self,
+                           point       : AllplanGeo.Point3D,
+                           max_distance: float = np.inf) -> tuple[int, float]:
+        """Finds the face of the reference polyhedron, that is nearest to the given point
+
+        The distance to a face is the larger of the distances to its plane and to its
+        bounding box (see FaceBVH). Only the hierarchy built by _rebuild_face_cache is used,
+        the polyhedron itself is not queried here.
 
         Args:
-            polyhedron: polyhedron to inspect
-            point:      point in 3D space
+            point:          point in 3D space
+            max_distance:   maximum distance between the point and the face
 
         Returns:
-            index of the face, whose plane is nearest to the given point
-            distance between the point and this face
+            index of the face, that is nearest to the given point, -1 if there is no face within max_distance
+            distance between the point and this face, infinity if there is no face within max_distance
 
         Raises:
-            ValueError: is the given polyhedron has more than 2^14 faces
+            ValueError: if there is no reference polyhedron
         """
 
-        if (faces_count := polyhedron.GetFacesCount()) > 2 ** 14:
-            raise ValueError("The polyhedron is too complex")
-
-        distances: list[float] = []
-
-        for face_index in range(faces_count):
-            _, face_nv         = polyhedron.GetNormalVectorOfFace(face_index)
-            _, edge            = polyhedron.GetFace(face_index).GetEdge(0)
-            _, face_vertex, _  = polyhedron.GetEdgeVertices(edge)
-
-            # distance between face's plane and the point
-            distance = abs(face_nv.DotProduct(AllplanGeo.Vector3D(point - face_vertex)))
-            distances.append(distance)
+        if self._bvh is None:
+            raise ValueError("There is no reference polyhedron")
 
-        min_distance = min(distances)
-        return distances.index(min_distance), min_distance
+        return self._bvh.nearest_face(np.array((point.X, point.Y, point.Z)), max_distance)
 
-    @staticmethod
-    def _calc_placement_matrix(normal_vec   : AllplanGeo.Vector3D,
+    def _calc_placement_matrix(self,
+                               normal_vec   : AllplanGeo.Vector3D,
                                placement_pnt: AllplanGeo.Point3D,
                                z_rotation   : AllplanGeo.Angle = AllplanGeo.Angle()) -> AllplanGeo.Matrix3D:
         """Calculates a placement matrix
@@ -115,6 +242,12 @@ class SnapToSolid():
         3.  Rotation:       align the local Z axis with the normal vector
         4.  Translation:    from local (0,0,0) to global point specified placement_pnt
 
+        The product of these transformations is assembled directly in closed form:
+        steps 1 and 2 are one rotation around Z by the sum of both angles, step 3 is the
+        shortest rotation of Z onto the reversed normal vector (Rodrigues' formula), and step 4
+        is the translation column. The rotation is cached per normal vector and angle. The values
+        are written into the preallocated _placement_buf and only one Matrix3D is constructed at the end.
+
         Args:
             normal_vec:     normal vector to align the local Z axis to
             placement_pnt:  point to translate the geometry into in the 4th step
@@ -123,33 +256,17 @@ class SnapToSolid():
         Returns:
             Placement matrix
         """
-        # step 1
-        project_on_xy = AllplanGeo.Matrix3D(1, 0, 0, 0,
-                                            0, 1, 0, 0,
-                                            0, 0, 0, 0,
-                                            0, 0, 0, 1)
-        normal_vec_xy = normal_vec * project_on_xy
-
-        pre_rotate = AllplanGeo.Matrix3D()
-
-        if not normal_vec_xy.IsZero():
-            pre_rotate.SetRotation(AllplanGeo.Vector3D(1, 0, 0) , normal_vec_xy)
-
-        # step 2
-        pre_rotate.Rotation(AllplanGeo.Line3D(0, 0, 0,
-                                              0, 0, 1),
-                            z_rotation)
-        # step 3
-        align_with_nv = AllplanGeo.Matrix3D()
-        align_with_nv.SetRotation(AllplanGeo.Vector3D(0, 0, 1),
-                                  normal_vec * -1)
+        norm      = normal_vec.GetLength()
+        placement = self._placement_buf
+
+        # steps 1 - 3
+        placement[:3, :3] = _rotation_matrix(normal_vec.X / norm, normal_vec.Y / norm, normal_vec.Z / norm,
+                                             z_rotation.Rad)
+
         # step 4
-        translate_to_global = AllplanGeo.Matrix3D()
-        translate_to_global.SetTranslation(AllplanGeo.Vector3D(placement_pnt))
+        placement[:3, 3] = placement_pnt.X, placement_pnt.Y, placement_pnt.Z
 
-        # combining steps:
-        #         1 + 2          3                 4
-        return pre_rotate * align_with_nv * translate_to_global
+        return AllplanGeo.Matrix3D(*placement.ravel().tolist())
 
     @typing.overload
     def snap_by_ray(self,
@@ -206,7 +323,7 @@ class SnapToSolid():
                     input_pnt  : AllplanGeo.Point3D,
                     rotation   : AllplanGeo.Angle,
                     mouse_msg  : int = 512,
-                    msg_info   : AllplanIFW.AddMsgInfo  = AllplanIFW.AddMsgInfo(),
+                    msg_info   : AllplanIFW.AddMsgInfo | None = None,
                     ) -> AllplanGeo.Matrix3D:
         """Calculates placement matrix, that snaps to an element with polyhedron geometry.
 
@@ -221,11 +338,14 @@ class SnapToSolid():
             input_pnt:  input point in world coordinate system
             rotation:   rotation around local Z axis
             mouse_msg:  mouse message
-            msg_info:   additional message info
+            msg_info:   additional message info, None if not triggered by a mouse message
 
         Returns:
             placement matrix
         """
+        if msg_info is None:
+            msg_info = _DEFAULT_MSG_INFO
+
         view_world_proj  = self._coord_input.GetViewWorldProjection()
         face_detected    = False
         view_pnt         = view_world_proj.WorldToView(input_pnt)                   # convert input point from world to view coordinates
@@ -244,7 +364,7 @@ class SnapToSolid():
                                                                        view_pnt,
                                                                        True,
                                                                        view_world_proj,
-                                                                       self._coord_input.GetInputViewDocument(),
+                                                                       self._doc,
                                                                        True)
         if face_detected:
             self._normal_vec = intersection_ray.FaceNv          # overwrite the last known normal vector
@@ -309,17 +429,17 @@ class SnapToSolid():
     def snap_by_point(self,
                       input_pnt : AllplanGeo.Point3D,
                       rotation  : AllplanGeo.Angle,
-                      mouse_msg : int                   = 512,
-                      view_pnt  : AllplanGeo.Point2D    = AllplanGeo.Point2D(),
-                      msg_info  : AllplanIFW.AddMsgInfo = AllplanIFW.AddMsgInfo(),
-                      tolerance : float                 = 20.0) -> AllplanGeo.Matrix3D:
+                      mouse_msg : int                          = 512,
+                      view_pnt  : AllplanGeo.Point2D | None    = None,
+                      msg_info  : AllplanIFW.AddMsgInfo | None = None,
+                      tolerance : float                        = 20.0) -> AllplanGeo.Matrix3D:
         """ Snap to the face of the reference element, that is nearest to the defined point.
 
         Args:
             input_pnt:      input point in world coordinate system
             rotation:       rotation around local Z axis
             mouse_msg:      mouse message
-            view_pnt:       input point in view coordinate system
+            view_pnt:       input point in view coordinate system, None if not triggered by a mouse message
             msg_info:       additional message info
             tolerance:      if the distance between the point and the nearest face is larger than
                             this value, no snapping is performed
@@ -328,27 +448,47 @@ class SnapToSolid():
             normal vector of the polygon face, where the point was found
         """
         # in case of mouse movement, search for element
-        if view_pnt != AllplanGeo.Point2D():
+        if view_pnt is not None:
 
             # if element is found, get it
-            if self._coord_input.SelectGeometryElement(mouse_msg, view_pnt, msg_info, False):
+            if self._coord_input.SelectGeometryElement(mouse_msg, view_pnt,
+                                                       msg_info if msg_info is not None else _DEFAULT_MSG_INFO,
+                                                       False):
                 element = self._coord_input.GetSelectedElement()
 
-                # if found element has a valid polyhedron geometry, override the previous reference polyhedron
-                if isinstance((phed := element.GetModelGeometry()), AllplanGeo.Polyhedron3D) and phed.IsValid():
-                    self._polyhedron = phed
+                # if found element is a new one with a valid polyhedron geometry, override the previous reference polyhedron
+                if element != self._reference_ele and \
+                        isinstance((phed := element.GetModelGeometry()), AllplanGeo.Polyhedron3D) and phed.IsValid():
+                    self._reference_ele = element
+
+                    # a too complex polyhedron is rejected once here, so it is not snapped to
+                    if phed.GetFacesCount() > self.MAX_FACES_COUNT:
+                        self.cancel_highlights()
+                        self._polyhedron = AllplanGeo.Polyhedron3D()
+                    else:
+                        self._polyhedron = phed
+
+                    self._rebuild_face_cache()
+
+                if element == self._reference_ele and self._bvh is not None:
                     AllplanIFW.HighlightService.HighlightElements(AllplanElementAdapter.BaseElementAdapterList([element]))
+                    self._highlighted = True
+
+        # the result depends only on the inputs below, as long as the reference polyhedron is the same
+        key = (input_pnt.X, input_pnt.Y, input_pnt.Z, rotation.Rad,
+               self._normal_vec.X, self._normal_vec.Y, self._normal_vec.Z, tolerance)
+
+        if key == self._last_key:
+            return self._last_matrix
 
         # perform snap, if there is a reference polyhedron to snap to
-        if self._polyhedron != self._calc_placement_matrix(self._normal_vec, input_pnt, rotation):
-            try:
-                nearest_face_idx, distance_to_face = self._find_nearest_face(self._polyhedron, input_pnt)
-            except ValueError:
-                AllplanIFW.HighlightService.CancelAllHighlightedElements(self._coord_input.GetInputViewDocumentID())
-                self._polyhedron = AllplanGeo.Polyhedron3D()
-                return self._calc_placement_matrix(self._normal_vec, input_pnt, rotation)
-
-            if distance_to_face <= tolerance:
+        if self._bvh is not None:
+            nearest_face_idx, _ = self._find_nearest_face(input_pnt, tolerance)
+
+            if nearest_face_idx >= 0:
                 _, self._normal_vec = self._polyhedron.GetNormalVectorOfFace(nearest_face_idx)
 
-        return self._calc_placement_matrix(self._normal_vec, input_pnt, rotation)
+        self._last_key    = key
+        self._last_matrix = self._calc_placement_matrix(self._normal_vec, input_pnt, rotation)
+
+        return self._last_matrix
@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import enum
-import os
+import functools
+import logging
+import struct
 
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any
 
 import NemAll_Python_BaseElements as AllplanBaseElements
 import NemAll_Python_BasisElements as AllplanBasisElements
@@ -14,19 +16,34 @@ import NemAll_Python_IFW_ElementAdapter as AllplanElementAdapter
 import NemAll_Python_IFW_Input as AllplanIFW
 
 from BaseInteractor import BaseInteractor
-from BuildingElement import BuildingElement
-from BuildingElementComposite import BuildingElementComposite
-from BuildingElementControlProperties import BuildingElementControlProperties
 from BuildingElementPaletteService import BuildingElementPaletteService
 from ControlPropertiesUtil import ControlPropertiesUtil
 from PythonPartTransaction import PythonPartTransaction
-from StringTableService import StringTableService
 from TypeCollections.ModificationElementList import ModificationElementList
-from VisualScriptService import VisualScriptService
 
 from .SnapToSolid import SnapToSolid
 
-print('FixturePlacement.py Loaded')
+if TYPE_CHECKING:
+    from BuildingElement import BuildingElement
+    from BuildingElementComposite import BuildingElementComposite
+    from BuildingElementControlProperties import BuildingElementControlProperties
+    from StringTableService import StringTableService
+
+logger = logging.getLogger(__name__)
+
+logger.debug("FixturePlacement.py Loaded")
+
+_IDENTITY_MAT = AllplanGeo.Matrix3D()
+"""Identity matrix used as the initial placement and passed to the VisualScriptService; never modified"""
+
+_ORIGIN = AllplanGeo.Point3D()
+"""Origin used as the initial placement and trace point; never modified"""
+
+_NO_PYTHONPART = AllplanBasisElements.MacroPlacementElement()
+"""Empty PythonPart used, when none is picked up; never modified"""
+
+_pack_matrix = struct.Struct("<16d").pack
+"""Packs the 16 coefficients of a matrix into bytes used as the key of the drawn preview"""
 
 
 def check_allplan_version(_build_ele: BuildingElement, version: float) -> bool:
@@ -99,6 +116,13 @@ class PypPlacementInteractor(BaseInteractor):
         MOVE = 2
         """Input mode, where the user moves an existing PythonPart with the snap functionality"""
 
+    class SnapMode(enum.IntEnum):
+        """ Definition of the snap modes, mirroring the values of SnapByRadioGroup"""
+        RAY   = 0
+        """The placement point is snapped to the face hit by the ray through the cursor"""
+        POINT = 1
+        """The placement point is snapped to the nearest face of the solid under the cursor"""
+
     def __init__(self,
                  coord_input        : AllplanIFW.CoordinateInput,
                  pyp_path           : str,
@@ -121,16 +145,36 @@ class PypPlacementInteractor(BaseInteractor):
         self.coord_input              = coord_input
         self.doc                      = self.coord_input.GetInputViewDocument()
         self.str_table_service        = str_table_service
-        self.placement_matrix         = AllplanGeo.Matrix3D()
+        self.placement_matrix         = _IDENTITY_MAT
         self.placement_angle          = AllplanGeo.Angle()
-        self.placement_point          = AllplanGeo.Point3D()
-        self.selected_pythonpart      = AllplanBasisElements.MacroPlacementElement()
-        self.trace_pnt                = AllplanGeo.Point3D()
+        self.placement_point          = _ORIGIN
+        self.selected_pythonpart      = _NO_PYTHONPART
+        self.trace_pnt                = _ORIGIN
         self.build_ele_list           = build_ele_list
         self.build_ele                = self.build_ele_list[0]
         self.control_props_list       = control_props_list
         self.visual_script_service    = None
-        self.snap                     = SnapToSolid(self.coord_input)
+        self._last_mouse_pnt          : tuple[float, float] | None = None
+        self._has_pose                = False
+        self._enter_mode              = {self.InputMode.SELECT: self._enter_select,
+                                         self.InputMode.PLACE : self._enter_place,
+                                         self.InputMode.MOVE  : self._enter_move}
+        self._snap_mode               = self.snap_mode_from_value(self.build_ele.SnapByRadioGroup.value)  # type: ignore
+        self._snap_fn                 = self._snap_to_ray if self._snap_mode is self.SnapMode.RAY else self._snap_to_point
+        self._last_drawn_matrix       : bytes | None = None
+        self._transaction             : PythonPartTransaction | None = None
+        self._preview_elements        : list | None = None
+        self._hidden_adapter          : AllplanElementAdapter.BaseElementAdapterList | None = None
+
+        # prompts and the angle input control are reused for every input initialization
+        self._prompt_select   = AllplanIFW.InputStringConvert("Select a VS-PythonPart from library or pick one from the model")
+        self._prompt_place    = AllplanIFW.InputStringConvert("Place the PythonPart; rotation around Z axis:")
+        self._angle_input_ctl = AllplanIFW.ValueInputControlData(AllplanIFW.eValueInputControlType.eANGLE_COMBOBOX,
+                                                                 initValue     = 0,
+                                                                 minValue      = -3.14159,
+                                                                 maxValue      = 3.14159,
+                                                                 bSetFocus     = True,
+                                                                 bDisableCoord = False)
 
         # initialize the service for the main palette
         self.main_palette_service = BuildingElementPaletteService(self.build_ele_list,
@@ -138,25 +182,48 @@ class PypPlacementInteractor(BaseInteractor):
                                                                   None,
                                                                   self.control_props_list,
                                                                   pyp_path)
-        self.main_palette_service.show_palette(self.build_ele_list[0].script_name)
+        self.main_palette_service.show_palette(self.build_ele.script_name)
 
-        # the initial mode is the selection mode
-        self.input_mode = self.InputMode.SELECT
+        # the initial mode is the selection mode, which is already set; only the input must be initialized
+        self.coord_input.InitFirstElementInput(self._prompt_select)
+        self.coord_input.SetElementFilter(self.pythonpart_filter)
 
         # the button to select a VS-PythonPart should be disabled in the MOVE mode
         self.ctrl_prop_util = ControlPropertiesUtil(control_props_list, build_ele_list)
         self.ctrl_prop_util.set_enable_function("FixtureFilePath",lambda: self.input_mode == self.InputMode.MOVE)
 
-    @property
+    @staticmethod
+    def snap_mode_from_value(value: str) -> PypPlacementInteractor.SnapMode:
+        """Translate the value of the SnapByRadioGroup into a snap mode
+
+        Args:
+            value:  value of the radio group
+
+        Returns:
+            snap mode
+        """
+        return PypPlacementInteractor.SnapMode.RAY if value == "SnapByRay" else PypPlacementInteractor.SnapMode.POINT
+
+    @functools.cached_property
+    def snap(self) -> SnapToSolid:
+        """Property with the snapping functionality, created on first access
+
+        Returns:
+            Snapping functionality
+        """
+        return SnapToSolid(self.coord_input)
+
+    @functools.cached_property
     def pythonpart_filter(self) -> AllplanIFW.ElementSelectFilterSetting:
         """Property with a selection filter accepting only PythonParts
 
+        The filter is created on first access and reused every time the SELECT mode is entered.
+
         Returns:
             Selection filter
         """
         type_uuids = [AllplanIFW.QueryTypeID(AllplanElementAdapter.PythonPart_TypeUUID)]
-        selection_query = AllplanIFW.SelectionQuery(type_uuids)
-        return AllplanIFW.ElementSelectFilterSetting(selection_query, False)
+        return AllplanIFW.ElementSelectFilterSetting(AllplanIFW.SelectionQuery(type_uuids), False)
 
     @property
     def input_mode(self) -> PypPlacementInteractor.InputMode:
@@ -176,59 +243,78 @@ class PypPlacementInteractor(BaseInteractor):
 
     @input_mode.setter
     def input_mode(self, value: PypPlacementInteractor.InputMode):
-        # by changing the mode to selection, close VS palette and show default palette
-        if value == self.InputMode.SELECT:
-            if self.visual_script_service is not None:
-                self.visual_script_service = None
-                self.build_ele.FixtureFilePath.value = ""           # type: ignore
-                self.main_palette_service.refresh_palette(self.build_ele_list, self.control_props_list)
-                self.main_palette_service.update_palette(-1, True)
-
-            elif self.input_mode == self.InputMode.MOVE:
-                AllplanIFW.VisibleService.ShowAllElements()
-                self.main_palette_service.update_palette(-1, True)
-
-            self.selected_pythonpart = AllplanBasisElements.MacroPlacementElement()
-
-            prompt_msg = AllplanIFW.InputStringConvert("Select a VS-PythonPart from library or pick one from the model")
-            self.coord_input.InitFirstElementInput(prompt_msg)
-            self.coord_input.SetElementFilter(self.pythonpart_filter)
-
-        elif value == self.InputMode.PLACE:
-            if not (vs_pythonpart_path := self.build_ele.FixtureFilePath.value).endswith(".pyp"):           # type: ignore
-                raise ValueError(f"The path to the VS-PythonPart is invalid: {vs_pythonpart_path}]")
-
-            self.main_palette_service.close_palette()
-            self.visual_script_service = VisualScriptService(self.coord_input,
-                                                             vs_pythonpart_path,
-                                                             self.str_table_service,
-                                                             self.build_ele_list,
-                                                             self.control_props_list,
-                                                             [])
-            self.init_placement_coord_input()
-        else:
-            self.init_placement_coord_input()
+        self._enter_mode[value]()
+
+        self.__input_mode       = value
+        self._last_drawn_matrix = None
+        self._preview_elements  = None
+        self._has_pose          = False
+        self._last_mouse_pnt    = None
+
+    def _enter_select(self):
+        """Prepare the SELECT mode
+
+        When coming from PLACE mode, the VS-PythonPart is released and the main palette is shown.
+        When coming from MOVE mode, the picked PythonPart is shown again.
+        """
+        if self.visual_script_service is not None:
+            self.visual_script_service = None
+            self._transaction          = None
+            self.build_ele.FixtureFilePath.value = ""           # type: ignore
+            self.main_palette_service.refresh_palette(self.build_ele_list, self.control_props_list)
             self.main_palette_service.update_palette(-1, True)
 
-        self.__input_mode = value
+        elif self.input_mode == self.InputMode.MOVE:
+            if self._hidden_adapter is not None:
+                AllplanIFW.VisibleService.ShowElements(self._hidden_adapter, True)
+                self._hidden_adapter = None
+            self.main_palette_service.update_palette(-1, True)
+
+        self.selected_pythonpart = _NO_PYTHONPART
+
+        self.coord_input.InitFirstElementInput(self._prompt_select)
+        self.coord_input.SetElementFilter(self.pythonpart_filter)
+
+    def _enter_place(self):
+        """Prepare the PLACE mode by loading the VS-PythonPart and showing its palette
+
+        Raises:
+            ValueError: when the path to the VS-PythonPart is not a .pyp file
+        """
+        if not (vs_pythonpart_path := self.build_ele.FixtureFilePath.value).endswith(".pyp"):           # type: ignore
+            raise ValueError(f"The path to the VS-PythonPart is invalid: {vs_pythonpart_path}]")
+
+        # imported only when a VS-PythonPart is placed for the first time
+        from VisualScriptService import VisualScriptService
+
+        self.main_palette_service.close_palette()
+        self.visual_script_service = VisualScriptService(self.coord_input,
+                                                         vs_pythonpart_path,
+                                                         self.str_table_service,
+                                                         self.build_ele_list,
+                                                         self.control_props_list,
+                                                         [])
+        self.init_placement_coord_input()
+
+    def _enter_move(self):
+        """Prepare the MOVE mode"""
+        self.init_placement_coord_input()
+        self.main_palette_service.update_palette(-1, True)
 
     def on_preview_draw(self):
         """ Called when an input in the dialog line is done (e.g. input of a coordinate or rotation angle).
         Gets the new coordinates or angle and updates the preview.
         """
+        self._snap_current_input()
+        self.draw_preview()
 
-        # update the placement, when a coordinate input in the dialog line was done
+    def _snap_current_input(self):
+        """Snap the current point and angle of the coordinate input and update the placement matrix"""
         self.placement_point     = self.coord_input.GetCurrentPoint().GetPoint()
         self.placement_angle.Rad = self.coord_input.GetInputControlValue()
 
-        if self.build_ele_list[0].SnapByRadioGroup.value == "SnapByRay":           # type: ignore
-            self.placement_matrix = self.snap.snap_by_ray(self.placement_point,
-                                                          self.placement_angle)
-        else:
-            self.placement_matrix = self.snap.snap_by_point(self.placement_point,
-                                                            self.placement_angle)
-
-        self.draw_preview()
+        self.placement_matrix = self._snap_fn()
+        self._has_pose        = True
 
     def on_value_input_control_enter(self) -> bool:
         """Handles the event of hitting enter during the input in the edit field in the dialog line
@@ -246,12 +332,21 @@ class PypPlacementInteractor(BaseInteractor):
             name:   name of the property
             value:  new value for property
         """
-        if name == "SnapByRadioGroup" and value != "SnapByPoint":
-            AllplanIFW.HighlightService.CancelAllHighlightedElements(self.coord_input.GetInputViewDocumentID())
+        if name == "SnapByRadioGroup":
+            self._snap_mode = self.snap_mode_from_value(value)
+            self._snap_fn   = self._snap_to_ray if self._snap_mode is self.SnapMode.RAY else self._snap_to_point
+
+            # highlights exist only, if the snapping was already used
+            if self._snap_mode is self.SnapMode.RAY and "snap" in vars(self):
+                self.snap.cancel_highlights()
+
+        # the preview elements may change
+        self._last_drawn_matrix = None
 
         # in placement mode, pass the argument to the visual script service
-        if self.input_mode == self.InputMode.PLACE and self.visual_script_service is not None:
-            self.visual_script_service.modify_element_property(page, name, value)
+        if (vs_service := self.visual_script_service) is not None and self.input_mode == self.InputMode.PLACE:
+            vs_service.modify_element_property(page, name, value)
+            self._preview_elements = None
         else:
             if self.main_palette_service.modify_element_property(page, name, value):
                 self.main_palette_service.update_palette(-1, False)
@@ -264,15 +359,25 @@ class PypPlacementInteractor(BaseInteractor):
         Args:
             event_id: event id of button control.
         """
-        if self.input_mode == self.InputMode.PLACE and self.visual_script_service is not None:
-            self.visual_script_service.on_control_event(event_id)
+        if (vs_service := self.visual_script_service) is not None and self.input_mode == self.InputMode.PLACE:
+            vs_service.on_control_event(event_id)
+            self._last_drawn_matrix = None
+            self._preview_elements  = None
 
     def on_mouse_leave(self):
         """ Handles the event of mouse leaving the viewport window.
 
-        The preview is drawn on the last known mouse position.
+        Allplan removes the preview, when the mouse leaves the viewport, so it is drawn again
+        on the last known mouse position. The last placement matrix is reused, unless no placement
+        was snapped since entering the current input mode. In SELECT mode there is no preview.
         """
-        self.on_preview_draw()
+        if self.input_mode == self.InputMode.SELECT:
+            return
+
+        if not self._has_pose:
+            self._snap_current_input()
+
+        self.draw_preview(force=True)
 
     def set_active_palette_page_index(self, active_page_index: int):
         """ Handles the event of changing the page in the property palette and a dialog
@@ -299,7 +404,7 @@ class PypPlacementInteractor(BaseInteractor):
         Returns:
             True when should be terminated, False when it should still run.
         """
-        if self.input_mode in  {self.InputMode.PLACE, self.InputMode.MOVE}:
+        if self.input_mode != self.InputMode.SELECT:
             if self.visual_script_service is not None:
                 vs_on_cancel_result = self.visual_script_service.on_cancel_function()
                 if not vs_on_cancel_result:
@@ -316,8 +421,8 @@ class PypPlacementInteractor(BaseInteractor):
 
         All the palettes are closed and the PythonPart is terminated.
         """
-        if self.input_mode == self.InputMode.PLACE and self.visual_script_service is not None:
-            self.visual_script_service.close_all()
+        if (vs_service := self.visual_script_service) is not None and self.input_mode == self.InputMode.PLACE:
+            vs_service.close_all()
 
         self.main_palette_service.close_palette()
 
@@ -335,6 +440,10 @@ class PypPlacementInteractor(BaseInteractor):
         -   In MOVE mode, moves the picked PythonPart to a new position and switches to SELECT mode
         -   In PLACE mode, creates the VS-PythonPart. Does not changes the mode.
 
+        A mouse move to the same point as the last handled one is skipped. Clicks are always handled.
+        Other messages, e.g. a wheel zoom or a pan, may change the view, so the next move is handled
+        even at the same point.
+
         Args:
             mouse_msg:  the mouse message.
             pnt:        the input point in view coordinates
@@ -344,8 +453,21 @@ class PypPlacementInteractor(BaseInteractor):
             True
         """
 
+        is_mouse_move = self.coord_input.IsMouseMove(mouse_msg)
+
+        # skip mouse moves, that would not change the preview
+        if is_mouse_move:
+            if (pnt.X, pnt.Y) == self._last_mouse_pnt:
+                return True
+
+            self._last_mouse_pnt = (pnt.X, pnt.Y)
+        else:
+            self._last_mouse_pnt = None
+
+        input_mode = self.input_mode
+
         # do nothing, if no fixture specified
-        if self.input_mode == self.InputMode.SELECT:
+        if input_mode == self.InputMode.SELECT:
             ele_found = self.coord_input.SelectElement(mouse_msg, pnt, msg_info,
                                                        True, False, False)
         else:
@@ -353,30 +475,50 @@ class PypPlacementInteractor(BaseInteractor):
                                                                   pnt,
                                                                   msg_info,
                                                                   self.trace_pnt,
-                                                                  self.input_mode == self.InputMode.MOVE).GetPoint()
+                                                                  input_mode == self.InputMode.MOVE).GetPoint()
 
-            if self.build_ele_list[0].SnapByRadioGroup.value == "SnapByRay":           # type: ignore
-                self.placement_matrix = self.snap.snap_by_ray(self.placement_point,
-                                                              self.placement_angle,
-                                                              mouse_msg, msg_info)
-            else:
-                self.placement_matrix = self.snap.snap_by_point(self.placement_point,
-                                                                self.placement_angle,
-                                                                mouse_msg, pnt, msg_info)
+            self.placement_matrix = self._snap_fn(mouse_msg=mouse_msg, view_pnt=pnt, msg_info=msg_info)
+            self._has_pose        = True
 
         self.draw_preview()
 
-        if not self.coord_input.IsMouseMove(mouse_msg):
-            if self.input_mode == self.InputMode.SELECT and ele_found:
+        if not is_mouse_move:
+            if input_mode == self.InputMode.SELECT and ele_found:
                 self.pick_up_pythonpart()
                 self.input_mode = self.InputMode.MOVE
 
-            elif self.input_mode in {self.InputMode.PLACE, self.InputMode.MOVE}:
+            elif input_mode != self.InputMode.SELECT:
                 self.create_elements()
-                if self.input_mode == self.InputMode.MOVE:
+                if input_mode == self.InputMode.MOVE:
                     self.input_mode = self.InputMode.SELECT
         return True
 
+    def _snap_to_ray(self,
+                     view_pnt   : AllplanGeo.Point2D | None = None,
+                     **mouse_input: Any) -> AllplanGeo.Matrix3D:
+        """Snap the current placement point and angle by a ray in the view direction
+
+        Args:
+            view_pnt:       input point in view coordinate system; not used by this snap mode
+            mouse_input:    mouse message and additional message info, if triggered by a mouse message
+
+        Returns:
+            placement matrix
+        """
+        return self.snap.snap_by_ray(self.placement_point, self.placement_angle, **mouse_input)
+
+    def _snap_to_point(self, **mouse_input: Any) -> AllplanGeo.Matrix3D:
+        """Snap the current placement point and angle to the nearest face of the solid under the cursor
+
+        Args:
+            mouse_input:    mouse message, input point in view coordinate system and additional message info,
+                            if triggered by a mouse message
+
+        Returns:
+            placement matrix
+        """
+        return self.snap.snap_by_point(self.placement_point, self.placement_angle, **mouse_input)
+
     def pick_up_pythonpart(self):
         """Pick up selected PythonPart.
 
@@ -386,43 +528,45 @@ class PypPlacementInteractor(BaseInteractor):
         -   Hide the original one
         """
         # get python object
-        pythonpart_adapter       = self.coord_input.GetSelectedElements()
+        pythonpart_adapter       = self.coord_input.GetSelectedElements()           # contains only the picked element
         pythonpart_assoc_view    = self.coord_input.GetSelectedElementAssocView()
-        self.selected_pythonpart = cast(AllplanBasisElements.MacroPlacementElement,
-                                        AllplanBaseElements.GetElements(pythonpart_adapter)[0])
+        self.selected_pythonpart = AllplanBaseElements.GetElements(pythonpart_adapter)[0]     # type: ignore
         # get the placement matrix to establish trace point and reset it to identity
         placement_props        = self.selected_pythonpart.MacroPlacementProperties
-        translation_vec        = placement_props.Matrix.GetTranslationVector()
-        self.trace_pnt         = AllplanGeo.Point3D(translation_vec.X, translation_vec.Y, translation_vec.Z)
-        self.trace_pnt         *= pythonpart_assoc_view.GetTransformationMatrix()
-        placement_props.Matrix = AllplanGeo.Matrix3D()
+        self.trace_pnt         = _ORIGIN * placement_props.Matrix * pythonpart_assoc_view.GetTransformationMatrix()
+        placement_props.Matrix = _IDENTITY_MAT
 
         self.selected_pythonpart.SetMacroPlacementProperties(placement_props)
 
         # hide the original
         AllplanIFW.VisibleService.ShowElements(pythonpart_adapter, False)
+        self._hidden_adapter = pythonpart_adapter
 
     def create_elements(self):
         """Create the elements in the database by executing a PythonPart transaction
 
-        In PLACE mode creates the VS-PythonPart using VisualScriptService.
-        In MOVE mode modifies (moves) the selected PythonPart.
+        In PLACE mode creates the VS-PythonPart using VisualScriptService. The transaction is
+        created with the first placement and reused for all placements until leaving PLACE mode.
+        In MOVE mode modifies (moves) the selected PythonPart. As it may be the reference element
+        of the snapping, the snapping reference is reset afterwards.
         """
-        if self.input_mode == self.InputMode.PLACE and self.visual_script_service is not None:
-            elements_to_create = self.visual_script_service.create_pythonpart(AllplanGeo.Matrix3D(),
-                                                                              AllplanGeo.Matrix3D())
+        if (vs_service := self.visual_script_service) is not None and self.input_mode == self.InputMode.PLACE:
+            elements_to_create = vs_service.create_pythonpart(_IDENTITY_MAT, _IDENTITY_MAT)
+
+            if self._transaction is None:
+                self._transaction = PythonPartTransaction(self.doc)
 
-            pyp_transaction = PythonPartTransaction(self.doc)
-            pyp_transaction.execute(self.placement_matrix,
-                                    self.coord_input.GetViewWorldProjection(),
-                                    elements_to_create,
-                                    ModificationElementList())
+            self._transaction.execute(self.placement_matrix,
+                                      self.coord_input.GetViewWorldProjection(),
+                                      elements_to_create,
+                                      ModificationElementList())
 
         elif self.input_mode == self.InputMode.MOVE:
             pyp_props = self.selected_pythonpart.MacroPlacementProperties
             pyp_props.Matrix = self.placement_matrix
             self.selected_pythonpart.MacroPlacementProperties = pyp_props
             AllplanBaseElements.ModifyElements(self.doc, [self.selected_pythonpart])
+            self.snap.reset_reference()
 
     def init_placement_coord_input(self):
         """Initialize the coordinate input
@@ -431,29 +575,40 @@ class PypPlacementInteractor(BaseInteractor):
         the fixture around its local Z axis
         """
 
-        prompt        = AllplanIFW.InputStringConvert("Place the PythonPart; rotation around Z axis:")
-        input_control = AllplanIFW.ValueInputControlData(AllplanIFW.eValueInputControlType.eANGLE_COMBOBOX,
-                                                         initValue     = 0,
-                                                         minValue      = -3.14159,
-                                                         maxValue      = 3.14159,
-                                                         bSetFocus     = True,
-                                                         bDisableCoord = False)
+        self.coord_input.InitFirstPointValueInput(self._prompt_place, self._angle_input_ctl)
 
-        self.coord_input.InitFirstPointValueInput(prompt, input_control)
-
-    def draw_preview(self):
+    def draw_preview(self, force: bool = False):
         """Draw the element preview in the viewport using current values for the placement point,
-        normal vector and additional rotation"""
-
-        if self.input_mode == self.InputMode.PLACE and self.visual_script_service is not None:
-            AllplanBaseElements.DrawElementPreview(self.doc,
-                                                   self.placement_matrix,
-                                                   self.visual_script_service.get_preview_elements(),
-                                                   bDirectDraw  = False,
-                                                   assoRefObj   = self.coord_input.GetInputAssocView())
+        normal vector and additional rotation
+
+        The preview is not drawn again, if neither the placement matrix nor the previewed
+        elements changed since the last drawing, unless forced. The preview elements of the
+        VS-PythonPart are created once and reused until a property of the VS-PythonPart is modified.
+
+        Args:
+            force:  draw the preview even if nothing changed, e.g. after Allplan removed it
+        """
+        if (vs_service := self.visual_script_service) is not None and self.input_mode == self.InputMode.PLACE:
+            # the placement is applied by the preview matrix, so the elements change only with the VS inputs
+            if self._preview_elements is None:
+                self._preview_elements = vs_service.get_preview_elements()
+
+            preview_elements = self._preview_elements
         elif self.input_mode == self.InputMode.MOVE:
-            AllplanBaseElements.DrawElementPreview(self.doc,
-                                                   self.placement_matrix,
-                                                   [self.selected_pythonpart],
-                                                   bDirectDraw  = False,
-                                                   assoRefObj   = self.coord_input.GetInputAssocView())
+            preview_elements = [self.selected_pythonpart]
+        else:
+            return
+
+        matrix     = self.placement_matrix
+        matrix_key = _pack_matrix(*[matrix.Get(row, col) for row in range(4) for col in range(4)])
+
+        if not force and matrix_key == self._last_drawn_matrix:
+            return
+
+        self._last_drawn_matrix = matrix_key
+
+        AllplanBaseElements.DrawElementPreview(self.doc,
+                                               matrix,
+                                               preview_elements,
+                                               bDirectDraw  = False,
+                                               assoRefObj   = self.coord_input.GetInputAssocView())